@@ -7,14 +7,50 @@ Usage:
     
     If old_commit is not provided, uses the commit from Claude.md metadata
     If new_commit is not provided, uses current HEAD
+
+When pygit2 is installed, queries go through a single in-process libgit2
+handle instead of spawning a git process per call.
 """
 
 import subprocess
 import sys
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
+try:
+    import pygit2
+except ImportError:  # Optional: fall back to the git CLI
+    pygit2 = None
+
+
+# Matches "Last updated: <hash>", "Last commit: <hash>", "<!-- commit: <hash> -->"
+# and "Commit: <hash>" in a single pass; the group name records which marker matched.
+_COMMIT_RE = re.compile(
+    r'Last\s+updated\s*:\s*(?P<updated>[0-9a-f]{7,40})'
+    r'|Last\s+commit\s*:\s*(?P<last>[0-9a-f]{7,40})'
+    r'|<!--\s*commit\s*:\s*(?P<html>[0-9a-f]{7,40})\s*-->'
+    r'|Commit\s*:\s*(?P<commit>[0-9a-f]{7,40})',
+    re.IGNORECASE
+)
+# Marker kinds from most to least authoritative; the first of the best kind wins,
+# so prose like "fixed in commit: <hash>" never beats a "Last updated" marker.
+_COMMIT_MARKERS = ('updated', 'last', 'html', 'commit')
+
+# The commit marker lives near the top or bottom of Claude.md, so only this
+# many bytes from each end are scanned.
+_CLAUDE_MD_SCAN_BYTES = 65536
+
+# Category rules checked in order against each changed path; first match wins.
+# Files matching none are features (added/modified) or other.
+_CATEGORY_RES = (
+    ('tests', re.compile(r'test|\.spec\.js$', re.IGNORECASE)),
+    ('docs', re.compile(r'\.md$|doc', re.IGNORECASE)),
+    ('config', re.compile(r'config|setup|requirements|\.json|\.yaml|\.toml', re.IGNORECASE)),
+)
+
 
 def run_git_command(repo_path, *args):
     """Run a git command and return the output."""
@@ -25,14 +61,82 @@ def run_git_command(repo_path, *args):
             text=True,
             check=True
         )
-        return result.stdout.strip()
+        return result.stdout.rstrip('\n')
     except subprocess.CalledProcessError as e:
         print(f"Git command failed: {e.stderr}", file=sys.stderr)
         return None
 
 
+def run_git_stream(repo_path, *args):
+    """Run a git command and yield its output line by line as it is produced."""
+    # git's stderr goes straight to ours: a pipe read only after stdout hits EOF
+    # could fill up and deadlock both processes
+    with subprocess.Popen(
+        ["git", "-C", repo_path, *args],
+        stdout=subprocess.PIPE,
+        text=True,
+        bufsize=1
+    ) as proc:
+        yield from iter(proc.stdout.readline, '')
+    if proc.returncode != 0:
+        print(f"Git command failed: git {args[0]} exited with status {proc.returncode}", file=sys.stderr)
+
+
+@lru_cache(maxsize=None)
+def open_repo(repo_path):
+    """Open a pygit2 repository handle, or return None to use the git CLI."""
+    if pygit2 is None:
+        return None
+    git_dir = pygit2.discover_repository(repo_path)
+    if git_dir is None:
+        return None
+    return pygit2.Repository(git_dir)
+
+
+def _pygit2_diff(repo, old_commit, new_commit):
+    """Diff two revisions, resolving them first so the cache never serves a moved ref."""
+    old_id = repo.revparse_single(old_commit).peel(pygit2.Commit).id
+    new_id = repo.revparse_single(new_commit).peel(pygit2.Commit).id
+    return _pygit2_diff_ids(repo, old_id, new_id)
+
+
+@lru_cache(maxsize=None)
+def _pygit2_diff_ids(repo, old_id, new_id):
+    """Compute (and cache) the tree diff between two commit ids."""
+    diff = repo.diff(old_id, new_id)
+    diff.find_similar()
+    return diff
+
+
+def _split_commit_message(message):
+    """Split a raw commit message into git's %s subject and %b body."""
+    lines = message.split('\n')
+    i = 0
+    while i < len(lines) and not lines[i].strip():
+        i += 1
+    start = i
+    while i < len(lines) and lines[i].strip():
+        i += 1
+    
+    # The subject is the whole first paragraph joined into one line
+    subject = ' '.join(line.rstrip() for line in lines[start:i])
+    while i < len(lines) and not lines[i].strip():
+        i += 1
+    body = '\n'.join(lines[i:])
+    if body and not body.endswith('\n'):
+        body += '\n'
+    return subject, body
+
+
 def get_current_commit(repo_path):
     """Get the current commit hash."""
+    repo = open_repo(repo_path)
+    if repo is not None:
+        try:
+            return str(repo.head.target)
+        except pygit2.GitError as e:
+            print(f"Git command failed: {e}", file=sys.stderr)
+            return None
     return run_git_command(repo_path, "rev-parse", "HEAD")
 
 
@@ -42,22 +146,24 @@ def get_commit_from_claude_md(repo_path):
     if not claude_md_path.exists():
         return None
     
-    with open(claude_md_path, 'r') as f:
-        content = f.read()
-    
-    # Look for patterns like "Last updated: <commit>" or "<!-- commit: <hash> -->"
-    patterns = [
-        r'Last\s+updated\s*:\s*([0-9a-f]{7,40})',
-        r'Last\s+commit\s*:\s*([0-9a-f]{7,40})',
-        r'<!--\s*commit\s*:\s*([0-9a-f]{7,40})\s*-->',
-        r'Commit\s*:\s*([0-9a-f]{7,40})',
-    ]
+    with open(claude_md_path, 'rb') as f:
+        head = f.read(_CLAUDE_MD_SCAN_BYTES)
+        size = f.seek(0, os.SEEK_END)
+        tail = b''
+        if size > len(head):
+            f.seek(max(size - _CLAUDE_MD_SCAN_BYTES, len(head)))
+            tail = f.read()
+    content = (head + b'\n' + tail).decode('utf-8', errors='replace')
     
-    for pattern in patterns:
-        match = re.search(pattern, content, re.IGNORECASE)
-        if match:
-            return match.group(1)
+    found = {}
+    for match in _COMMIT_RE.finditer(content):
+        if match.lastgroup == _COMMIT_MARKERS[0]:
+            return match.group(match.lastgroup)
+        found.setdefault(match.lastgroup, match.group(match.lastgroup))
     
+    for marker in _COMMIT_MARKERS:
+        if marker in found:
+            return found[marker]
     return None
 
 
@@ -66,19 +172,27 @@ def get_changed_files(repo_path, old_commit, new_commit):
     if not old_commit:
         return []
     
-    output = run_git_command(repo_path, "diff", "--name-status", f"{old_commit}..{new_commit}")
-    if not output:
-        return []
-    
-    files = []
-    for line in output.split('\n'):
-        if line.strip():
-            parts = line.split('\t', 1)
-            if len(parts) == 2:
-                status, filepath = parts
-                files.append({'status': status, 'path': filepath})
+    repo = open_repo(repo_path)
+    if repo is not None:
+        try:
+            diff = _pygit2_diff(repo, old_commit, new_commit)
+        except (pygit2.GitError, ValueError) as e:
+            print(f"Git command failed: {e}", file=sys.stderr)
+            return []
+        files = []
+        for delta in diff.deltas:
+            status = delta.status_char()
+            path = delta.new_file.path
+            if status in ('R', 'C'):
+                # Same "old<TAB>new" path as git diff --name-status
+                status = f"{status}{delta.similarity:03d}"
+                path = f"{delta.old_file.path}\t{path}"
+            files.append({'status': status, 'path': path})
+        return files
     
-    return files
+    lines = run_git_stream(repo_path, "diff", "--name-status", f"{old_commit}..{new_commit}")
+    rows = (line.rstrip('\n').split('\t', 1) for line in lines)
+    return [{'status': row[0], 'path': row[1]} for row in rows if len(row) == 2]
 
 
 def get_commit_messages(repo_path, old_commit, new_commit):
@@ -86,27 +200,50 @@ def get_commit_messages(repo_path, old_commit, new_commit):
     if not old_commit:
         return []
     
-    output = run_git_command(
+    repo = open_repo(repo_path)
+    if repo is not None:
+        try:
+            walker = repo.walk(repo.revparse_single(new_commit).id,
+                               pygit2.GIT_SORT_TOPOLOGICAL | pygit2.GIT_SORT_TIME)
+            walker.hide(repo.revparse_single(old_commit).id)
+        except (pygit2.GitError, ValueError) as e:
+            print(f"Git command failed: {e}", file=sys.stderr)
+            return []
+        commits = []
+        for commit in walker:
+            if len(commit.parent_ids) > 1:  # --no-merges
+                continue
+            subject, body = _split_commit_message(commit.message)
+            commits.append({
+                'hash': str(commit.id)[:7],
+                'subject': subject,
+                'body': body
+            })
+        return commits
+    
+    lines = run_git_stream(
         repo_path, 
         "log", 
         f"{old_commit}..{new_commit}",
-        "--pretty=format:%H|%s|%b",
+        "--pretty=format:%H%x00%s%x00%b%x1e",
         "--no-merges"
     )
     
-    if not output:
-        return []
-    
+    # Fields are NUL-separated and each commit ends with an RS (0x1e), so
+    # subjects and bodies may contain any printable text
     commits = []
-    for line in output.split('\n'):
-        if '|' in line:
-            parts = line.split('|', 2)
-            if len(parts) >= 2:
-                commits.append({
-                    'hash': parts[0][:7],
-                    'subject': parts[1],
-                    'body': parts[2] if len(parts) > 2 else ''
-                })
+    record = []
+    for line in lines:
+        record.append(line)
+        if '\x1e' not in line:
+            continue
+        commit_hash, subject, body = ''.join(record).partition('\x1e')[0].split('\x00', 2)
+        commits.append({
+            'hash': commit_hash[:7],
+            'subject': subject,
+            'body': body
+        })
+        record = []
     
     return commits
 
@@ -116,6 +253,15 @@ def get_diff_stats(repo_path, old_commit, new_commit):
     if not old_commit:
         return None
     
+    repo = open_repo(repo_path)
+    if repo is not None:
+        try:
+            stats = _pygit2_diff(repo, old_commit, new_commit).stats
+        except (pygit2.GitError, ValueError) as e:
+            print(f"Git command failed: {e}", file=sys.stderr)
+            return None
+        return stats.format(pygit2.GIT_DIFF_STATS_FULL, 80).rstrip()
+    
     output = run_git_command(repo_path, "diff", "--stat", f"{old_commit}..{new_commit}")
     return output
 
@@ -131,18 +277,15 @@ def categorize_changes(files):
     }
     
     for file_info in files:
-        path = file_info['path'].lower()
-        
-        if 'test' in path or path.endswith('.test.py') or path.endswith('.spec.js'):
-            categories['tests'].append(file_info)
-        elif path.endswith('.md') or 'doc' in path or path.startswith('docs/'):
-            categories['docs'].append(file_info)
-        elif any(x in path for x in ['config', 'setup', '.json', '.yaml', '.toml', 'requirements', 'package.json']):
-            categories['config'].append(file_info)
-        elif file_info['status'] in ['A', 'M']:  # Added or Modified
-            categories['features'].append(file_info)
+        for category, pattern in _CATEGORY_RES:
+            if pattern.search(file_info['path']):
+                categories[category].append(file_info)
+                break
         else:
-            categories['other'].append(file_info)
+            if file_info['status'] in ['A', 'M']:  # Added or Modified
+                categories['features'].append(file_info)
+            else:
+                categories['other'].append(file_info)
     
     return categories
 
@@ -171,9 +314,14 @@ def main():
         print("No changes: Old and new commits are the same")
         sys.exit(0)
     
-    # Get changes
-    changed_files = get_changed_files(repo_path, old_commit, new_commit)
-    commits = get_commit_messages(repo_path, old_commit, new_commit)
+    # Get changes. On the git CLI path each query is an independent process,
+    # so they run concurrently; a pygit2 handle is not shared across threads.
+    max_workers = 2 if open_repo(repo_path) is None else 1
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        files_future = executor.submit(get_changed_files, repo_path, old_commit, new_commit)
+        commits_future = executor.submit(get_commit_messages, repo_path, old_commit, new_commit)
+    changed_files = files_future.result()
+    commits = commits_future.result()
     
     if not changed_files and not commits:
         print("No changes detected")
@@ -212,23 +360,24 @@ def main():
         for commit in commits:
             print(f"\n  {commit['hash']}: {commit['subject']}")
             if commit['body']:
-                body_lines = commit['body'].strip().split('\n')[:3]
+                body_lines = commit['body'].strip().splitlines()[:3]
                 for line in body_lines:
                     if line.strip():
                         print(f"    {line.strip()}")
     
-    # Show diff stats
-    print("\n\nDIFF STATISTICS:")
-    stats = get_diff_stats(repo_path, old_commit, new_commit)
-    if stats:
-        print(stats)
-    
-    print("\n" + "=" * 60)
-    
     # Determine if changes are significant
     feature_count = len(categories['features'])
     config_count = len(categories['config'])
     
+    # Show diff stats, skipping the full-range diff when the update will be skipped
+    if feature_count >= 1:
+        print("\n\nDIFF STATISTICS:")
+        stats = get_diff_stats(repo_path, old_commit, new_commit)
+        if stats:
+            print(stats)
+    
+    print("\n" + "=" * 60)
+    
     if feature_count >= 3 or (feature_count >= 1 and len(commits) >= 3):
         print("\n✅ RECOMMENDATION: Significant changes detected - UPDATE Claude.md")
         print(f"   Reason: {feature_count} feature files changed across {len(commits)} commits")
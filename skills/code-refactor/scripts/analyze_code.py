@@ -13,10 +13,80 @@ Analyzes code files to identify:
 import os
 import re
 import sys
+import heapq
 import argparse
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from collections import defaultdict, Counter
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
+
+# Polynomial rolling hash parameters for duplicate block detection
+_HASH_BASE = 1000003
+_HASH_MOD = (1 << 61) - 1
+
+# Language by lowercased file extension
+_LANGUAGE_BY_EXT = {
+    '.py': 'python',
+    '.js': 'javascript',
+    '.ts': 'typescript',
+    '.java': 'java',
+    '.cpp': 'cpp',
+    '.c': 'c',
+    '.cs': 'csharp',
+    '.go': 'go',
+    '.rb': 'ruby',
+    '.php': 'php',
+    '.rs': 'rust',
+}
+
+# Comment line prefixes (language-specific would be better)
+_COMMENT_PREFIX = {
+    'python': ('#',),
+    'javascript': ('//',),
+    'typescript': ('//',),
+    'java': ('//',),
+    'cpp': ('//',),
+    'c': ('//',),
+    'csharp': ('//',),
+    'go': ('//',),
+    'ruby': ('#',),
+    'php': ('//',),
+    'rust': ('//',),
+}
+_ANY_COMMENT_PREFIX = ('#', '//')
+
+# Simple function detection patterns
+_FUNC_PATTERNS_RE = {
+    'python': re.compile(r'^\s*def\s+(\w+)'),
+    'javascript': re.compile(r'^\s*(?:function\s+(\w+)|(?:const|let|var)\s+(\w+)\s*=\s*(?:async\s+)?(?:function|\())'),
+    'typescript': re.compile(r'^\s*(?:function\s+(\w+)|(?:const|let|var)\s+(\w+)\s*=\s*(?:async\s+)?(?:function|\())'),
+    'java': re.compile(r'^\s*(?:public|private|protected)?\s*(?:static)?\s*(?:\w+)\s+(\w+)\s*\('),
+}
+
+# Indent width per nesting level
+_INDENT_CHARS = {
+    'python': 4,
+    'javascript': 2,
+    'typescript': 2,
+}
+
+# Directory analysis: files to analyze and directories never descended into
+_CODE_EXTENSIONS = ('.py', '.js', '.ts', '.java', '.cpp', '.c', '.cs', '.go', '.rb', '.php', '.rs')
+_SKIP_DIRS = frozenset({'.git', 'node_modules', '__pycache__', '.venv', 'venv', 'dist', 'build'})
+
+# Numeric literals (excluding 0, 1, -1), scanned over the whole file at once,
+# plus the newline and comment-line-start patterns used to place each match.
+_MAGIC_NUMBER_RE = re.compile(r'\b(?!0\b|1\b|-1\b)[-+]?\d+\.?\d*\b')
+_NEWLINE_RE = re.compile(r'\n')
+_COMMENT_START_RE = re.compile(r'[^\S\n]*(?:#|//)')
+
+
+@lru_cache(maxsize=64)
+def _detect_language(ext: str) -> str:
+    """Detect programming language from a lowercased file extension"""
+    return _LANGUAGE_BY_EXT.get(ext, 'unknown')
 
 
 class CodeAnalyzer:
@@ -25,29 +95,13 @@ class CodeAnalyzer:
     def __init__(self, file_path: str):
         self.file_path = file_path
         self.lines = []
-        self.language = self._detect_language()
+        self._scan_cache = None
+        self.language = _detect_language(Path(file_path).suffix.lower())
         self.load_file()
-        
-    def _detect_language(self) -> str:
-        """Detect programming language from file extension"""
-        ext = Path(self.file_path).suffix.lower()
-        lang_map = {
-            '.py': 'python',
-            '.js': 'javascript',
-            '.ts': 'typescript',
-            '.java': 'java',
-            '.cpp': 'cpp',
-            '.c': 'c',
-            '.cs': 'csharp',
-            '.go': 'go',
-            '.rb': 'ruby',
-            '.php': 'php',
-            '.rs': 'rust',
-        }
-        return lang_map.get(ext, 'unknown')
     
     def load_file(self):
         """Load file contents"""
+        self._scan_cache = None
         try:
             with open(self.file_path, 'r', encoding='utf-8') as f:
                 self.lines = f.readlines()
@@ -55,29 +109,46 @@ class CodeAnalyzer:
             print(f"Error reading {self.file_path}: {e}")
             self.lines = []
     
-    def count_loc(self) -> Dict[str, int]:
-        """Count lines of code, excluding comments and blank lines"""
-        total = len(self.lines)
-        blank = sum(1 for line in self.lines if line.strip() == '')
+    def _scan(self) -> Dict:
+        """Collect line-level data for the metrics in a single pass over the file"""
+        if self._scan_cache is not None:
+            return self._scan_cache
         
-        # Simple comment detection (language-specific would be better)
-        comment_patterns = {
-            'python': r'^\s*#',
-            'javascript': r'^\s*//',
-            'typescript': r'^\s*//',
-            'java': r'^\s*//',
-            'cpp': r'^\s*//',
-            'c': r'^\s*//',
-            'csharp': r'^\s*//',
-            'go': r'^\s*//',
-            'ruby': r'^\s*#',
-            'php': r'^\s*//',
-            'rust': r'^\s*//',
-        }
+        comment_prefixes = _COMMENT_PREFIX.get(self.language, _ANY_COMMENT_PREFIX)
+        blank = 0
+        comments = 0
+        normalized = []
+        indents = []
         
-        pattern = comment_patterns.get(self.language, r'^\s*#|^\s*//')
-        comments = sum(1 for line in self.lines if re.match(pattern, line))
+        for i, line in enumerate(self.lines, 1):
+            stripped = line.strip()
+            if not stripped:
+                blank += 1
+                indents.append(None)
+                continue
+            
+            indents.append(len(line) - len(line.lstrip()))
+            if stripped.startswith(comment_prefixes):
+                comments += 1
+            
+            # Normalize lines (remove whitespace and comments for comparison)
+            if not stripped.startswith(_ANY_COMMENT_PREFIX):
+                normalized.append(stripped)
         
+        self._scan_cache = {
+            'blank': blank,
+            'comments': comments,
+            'normalized': normalized,
+            'indents': indents,
+        }
+        return self._scan_cache
+    
+    def count_loc(self) -> Dict[str, int]:
+        """Count lines of code, excluding comments and blank lines"""
+        scan = self._scan()
+        total = len(self.lines)
+        blank = scan['blank']
+        comments = scan['comments']
         code = total - blank - comments
         
         return {
@@ -87,19 +158,11 @@ class CodeAnalyzer:
             'comments': comments
         }
     
-    def find_long_functions(self, threshold: int = 50) -> List[Dict]:
-        """Find functions longer than threshold"""
+    def find_long_functions(self, threshold: int = 50, limit: Optional[int] = None) -> List[Dict]:
+        """Find functions longer than threshold, stopping after `limit` matches"""
         long_functions = []
         
-        # Simple function detection patterns
-        func_patterns = {
-            'python': r'^\s*def\s+(\w+)',
-            'javascript': r'^\s*(?:function\s+(\w+)|(?:const|let|var)\s+(\w+)\s*=\s*(?:async\s+)?(?:function|\())',
-            'typescript': r'^\s*(?:function\s+(\w+)|(?:const|let|var)\s+(\w+)\s*=\s*(?:async\s+)?(?:function|\())',
-            'java': r'^\s*(?:public|private|protected)?\s*(?:static)?\s*(?:\w+)\s+(\w+)\s*\(',
-        }
-        
-        pattern = func_patterns.get(self.language)
+        pattern = _FUNC_PATTERNS_RE.get(self.language)
         if not pattern:
             return long_functions
         
@@ -110,7 +173,7 @@ class CodeAnalyzer:
         
         for i, line in enumerate(self.lines, 1):
             # Detect function start
-            match = re.search(pattern, line)
+            match = pattern.search(line)
             if match:
                 current_func = match.group(1) or match.group(2)
                 func_start = i
@@ -129,58 +192,75 @@ class CodeAnalyzer:
                             'start': func_start,
                             'length': func_length
                         })
+                        if limit is not None and len(long_functions) >= limit:
+                            break
                     current_func = None
         
         return long_functions
     
-    def find_duplicate_blocks(self, min_lines: int = 5) -> List[Dict]:
-        """Find duplicate code blocks"""
+    def find_duplicate_blocks(self, min_lines: int = 5, limit: Optional[int] = None) -> List[Dict]:
+        """Find duplicate code blocks, keeping only the `limit` most repeated"""
         duplicates = []
+        normalized = self._scan()['normalized']
         
-        # Normalize lines (remove whitespace and comments for comparison)
-        normalized = []
-        for line in self.lines:
-            stripped = line.strip()
-            # Skip blank lines and simple comments
-            if stripped and not stripped.startswith(('#', '//')):
-                normalized.append(stripped)
+        if len(normalized) <= min_lines:
+            return duplicates
         
-        # Look for duplicate sequences
-        seen_blocks = defaultdict(list)
-        
-        for i in range(len(normalized) - min_lines):
-            block = tuple(normalized[i:i + min_lines])
-            seen_blocks[block].append(i)
+        groups = self._duplicate_groups(normalized, min_lines)
         
         # Find blocks that appear multiple times
-        for block, positions in seen_blocks.items():
-            if len(positions) > 1:
-                duplicates.append({
-                    'lines': min_lines,
-                    'occurrences': len(positions),
-                    'positions': positions,
-                    'sample': '\n'.join(block[:3])  # First 3 lines as sample
-                })
+        repeated = (positions for positions in groups if len(positions) > 1)
+        if limit is not None:
+            repeated = heapq.nlargest(limit, repeated, key=len)
+        
+        for positions in repeated:
+            start = positions[0]
+            duplicates.append({
+                'lines': min_lines,
+                'occurrences': len(positions),
+                'positions': positions,
+                'sample': '\n'.join(normalized[start:start + 3])  # First 3 lines as sample
+            })
         
         return sorted(duplicates, key=lambda x: x['occurrences'] * x['lines'], reverse=True)
     
+    @staticmethod
+    def _duplicate_groups(normalized: List[str], min_lines: int) -> List[List[int]]:
+        """Group window start positions by block content using a rolling hash"""
+        # Hash hits are confirmed against the actual lines to rule out collisions
+        num_windows = len(normalized) - min_lines
+        line_hashes = [hash(line) % _HASH_MOD for line in normalized]
+        high_power = pow(_HASH_BASE, min_lines - 1, _HASH_MOD)
+        window_hash = 0
+        for h in line_hashes[:min_lines]:
+            window_hash = (window_hash * _HASH_BASE + h) % _HASH_MOD
+        
+        seen_blocks = defaultdict(list)
+        
+        for i in range(num_windows):
+            for positions in seen_blocks[window_hash]:
+                start = positions[0]
+                if normalized[start:start + min_lines] == normalized[i:i + min_lines]:
+                    positions.append(i)
+                    break
+            else:
+                seen_blocks[window_hash].append([i])
+            
+            window_hash = ((window_hash - line_hashes[i] * high_power) * _HASH_BASE
+                           + line_hashes[i + min_lines]) % _HASH_MOD
+        
+        return [positions for groups in seen_blocks.values() for positions in groups]
+    
     def analyze_nesting(self) -> Dict:
         """Analyze nesting depth"""
         max_depth = 0
         current_depth = 0
         deep_lines = []
         
-        indent_chars = {
-            'python': 4,
-            'javascript': 2,
-            'typescript': 2,
-        }
-        
-        indent_size = indent_chars.get(self.language, 4)
+        indent_size = _INDENT_CHARS.get(self.language, 4)
         
-        for i, line in enumerate(self.lines, 1):
-            if line.strip():
-                indent = len(line) - len(line.lstrip())
+        for i, indent in enumerate(self._scan()['indents'], 1):
+            if indent is not None:
                 depth = indent // indent_size
                 current_depth = depth
                 
@@ -195,23 +275,28 @@ class CodeAnalyzer:
             'deep_nesting_lines': deep_lines[:10]  # First 10
         }
     
-    def find_magic_numbers(self) -> List[Tuple[int, str]]:
-        """Find magic numbers in code"""
+    def find_magic_numbers(self, limit: Optional[int] = 20) -> List[Tuple[int, str]]:
+        """Find magic numbers in code, stopping after `limit` matches"""
+        buf = ''.join(self.lines)
+        newlines = [match.start() for match in _NEWLINE_RE.finditer(buf)]
+        comment_lines = {}
         magic_numbers = []
         
-        # Pattern for numeric literals (excluding 0, 1, -1)
-        pattern = r'\b(?!0\b|1\b|-1\b)[-+]?\d+\.?\d*\b'
-        
-        for i, line in enumerate(self.lines, 1):
+        for match in _MAGIC_NUMBER_RE.finditer(buf):
+            line = bisect_right(newlines, match.start())
+            
             # Skip comments
-            if re.match(r'^\s*#|^\s*//', line):
+            if line not in comment_lines:
+                line_start = newlines[line - 1] + 1 if line else 0
+                comment_lines[line] = _COMMENT_START_RE.match(buf, line_start) is not None
+            if comment_lines[line]:
                 continue
             
-            matches = re.finditer(pattern, line)
-            for match in matches:
-                magic_numbers.append((i, match.group()))
+            magic_numbers.append((line + 1, match.group()))
+            if limit is not None and len(magic_numbers) >= limit:
+                break
         
-        return magic_numbers[:20]  # Return first 20
+        return magic_numbers
     
     def generate_report(self) -> str:
         """Generate comprehensive analysis report"""
@@ -291,20 +376,41 @@ class CodeAnalyzer:
         return '\n'.join(report)
 
 
-def analyze_directory(directory: str, recursive: bool = False):
-    """Analyze all code files in a directory"""
-    code_extensions = {'.py', '.js', '.ts', '.java', '.cpp', '.c', '.cs', '.go', '.rb', '.php', '.rs'}
+def _analyze_one(file_path: Path) -> Optional[Tuple[Path, str]]:
+    """Analyze a single file, returning its formatted report"""
+    analyzer = CodeAnalyzer(str(file_path))
+    if not analyzer.lines:
+        return None
+    return file_path, analyzer.generate_report()
+
+
+def _find_code_files(directory: str, recursive: bool, exclude: Tuple[str, ...] = ()) -> List[Path]:
+    """List code files under directory, pruning ignored directories before descending"""
+    skip_dirs = _SKIP_DIRS.union(exclude)
+    file_paths = []
     
-    path = Path(directory)
-    pattern = '**/*' if recursive else '*'
+    for root, dirnames, filenames in os.walk(directory):
+        dirnames[:] = [d for d in dirnames if d not in skip_dirs] if recursive else []
+        for name in filenames:
+            if name.endswith(_CODE_EXTENSIONS):
+                file_paths.append(Path(root) / name)
     
-    results = []
+    return file_paths
+
+
+def analyze_directory(directory: str, recursive: bool = False, jobs: Optional[int] = None,
+                      exclude: Tuple[str, ...] = ()):
+    """Analyze all code files in a directory, using up to `jobs` worker processes"""
+    file_paths = _find_code_files(directory, recursive, exclude)
+    
+    # Reports are returned as strings so the analyzers never need pickling
+    if jobs == 1:
+        reports = list(map(_analyze_one, file_paths))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            reports = list(executor.map(_analyze_one, file_paths, chunksize=8))
     
-    for file_path in path.glob(pattern):
-        if file_path.is_file() and file_path.suffix in code_extensions:
-            analyzer = CodeAnalyzer(str(file_path))
-            if analyzer.lines:
-                results.append((file_path, analyzer))
+    results = [result for result in reports if result is not None]
     
     # Summary report
     print(f"\n{'='*60}")
@@ -313,8 +419,19 @@ def analyze_directory(directory: str, recursive: bool = False):
     print(f"Files analyzed: {len(results)}\n")
     
     # Individual reports
-    for file_path, analyzer in results:
-        print(analyzer.generate_report())
+    for file_path, report in results:
+        print(report)
+
+
+def _positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1"""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value!r}")
+    return number
 
 
 def main():
@@ -322,6 +439,10 @@ def main():
     parser.add_argument('path', help='Path to file or directory')
     parser.add_argument('-r', '--recursive', action='store_true', help='Recursively analyze directory')
     parser.add_argument('--report', action='store_true', help='Generate detailed report')
+    parser.add_argument('-j', '--jobs', type=_positive_int, default=os.cpu_count(),
+                        help='Worker processes for directory analysis (1 = serial; default: CPU count)')
+    parser.add_argument('--exclude', action='append', default=[], metavar='DIR',
+                        help='Directory name to skip during directory analysis (repeatable)')
     
     args = parser.parse_args()
     
@@ -329,7 +450,7 @@ def main():
         analyzer = CodeAnalyzer(args.path)
         print(analyzer.generate_report())
     elif os.path.isdir(args.path):
-        analyze_directory(args.path, args.recursive)
+        analyze_directory(args.path, args.recursive, args.jobs, tuple(args.exclude))
     else:
         print(f"Error: {args.path} is not a valid file or directory")
         sys.exit(1)
@@ -42,37 +42,36 @@ def get_diff(base_branch='main', show_stats=False):
         print(f"Make sure you have fetched the latest {base_branch} branch", file=sys.stderr)
         sys.exit(1)
     
-    # Get the diff
-    diff_result = subprocess.run(
-        ['git', 'diff', merge_base, 'HEAD'],
+    # Get the raw file list, statistics and patch from a single tree diff.
+    # Output is the --raw lines, then the --stat lines, a blank line and the patch.
+    combined = subprocess.run(
+        ['git', 'diff', '--raw', '--stat', '--patch', merge_base, 'HEAD'],
         capture_output=True,
         text=True,
         check=True
-    )
+    ).stdout
+    header, _, diff = combined.partition('\n\n')
     
-    # Get file statistics
-    stats_result = subprocess.run(
-        ['git', 'diff', '--stat', merge_base, 'HEAD'],
-        capture_output=True,
-        text=True,
-        check=True
-    )
+    raw_lines = []
+    stat_lines = []
+    for line in header.splitlines():
+        if line.startswith(':'):
+            # ":<old mode> <new mode> <old sha> <new sha> <status>\t<path>[\t<path>]"
+            raw_lines.append(line.split(' ', 4)[4])
+        else:
+            stat_lines.append(line)
     
-    # Get list of changed files with their change type
-    changed_files = subprocess.run(
-        ['git', 'diff', '--name-status', merge_base, 'HEAD'],
-        capture_output=True,
-        text=True,
-        check=True
-    )
+    # Match the --name-status and --stat output formats
+    changed_files = ''.join(f'{line}\n' for line in raw_lines)
+    stats = ''.join(f'{line}\n' for line in stat_lines)
     
     return {
         'current_branch': current_branch,
         'base_branch': base_branch,
         'merge_base': merge_base,
-        'diff': diff_result.stdout,
-        'stats': stats_result.stdout,
-        'changed_files': changed_files.stdout
+        'diff': diff,
+        'stats': stats,
+        'changed_files': changed_files
     }
 
 def main():
@@ -4,162 +4,277 @@ Trace dependencies for a given focus file by analyzing import statements,
 require calls, and other dependency patterns across multiple languages.
 """
 
+import ast
+import mmap
 import os
 import re
 import sys
+import warnings
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Set, Dict, List, Tuple
 
 
+# Import patterns per language, compiled once at load time. A language's forms
+# are fused into one alternation where they cannot consume each other's text;
+# the capturing group of whichever branch matched is match.lastindex.
+# Patterns are bytes so they run directly over memory-mapped files.
+
+# Python: import module, from module import x, from . import x, from ..module import x
+_PY_IMPORT_RE = re.compile(
+    rb'^\s*(?:import\s+(?P<abs>[a-zA-Z_][\w.]*)'
+    rb'|from\s+(?P<from>[a-zA-Z_][\w.]*|\.+[\w.]*)\s+import)',
+    re.MULTILINE
+)
+
+# JavaScript/TypeScript: import x from 'path'. Its lazy .*? can run across later
+# statements on the same line, so the call forms are a separate scan it cannot consume.
+_JS_IMPORT_RE = re.compile(rb'import\s+.*?\s+from\s+["\']([^"\']+)["\']')
+# JavaScript/TypeScript: require('path') and import('path')
+_JS_CALL_RE = re.compile(
+    rb'require\s*\(["\']([^"\']+)["\']\)'
+    rb'|import\s*\(["\']([^"\']+)["\']\)'
+)
+
+# Go: import "path" (group 1) and import ( "path1" "path2" ) (group 2, the block body)
+_GO_IMPORT_RE = re.compile(rb'import\s+"([^"]+)"|import\s*\(([^)]*)\)')
+# Go: every path literal inside an import block
+_GO_STR_RE = re.compile(rb'"([^"]+)"')
+
+# Java: import package.Class;
+_JAVA_IMPORT_RE = re.compile(rb'import\s+([\w.]+);')
+
+# C/C++: #include "file.h" and #include <file.h>, as a preprocessor line (also # include)
+_C_INCLUDE_RE = re.compile(rb'^\s*#\s*include\s+(?:"([^"]+)"|<([^>]+)>)', re.MULTILINE)
+
+# Directories never descended into: VCS metadata, dependencies, envs, caches and build output
+_SKIP_DIRS = frozenset({
+    '.git', '__pycache__', 'node_modules', 'venv', '.venv', 'dist', 'build',
+    '.mypy_cache', '.pytest_cache', '.tox', 'target',
+})
+
+# Source file extensions indexed by the file map
+_EXTS = frozenset({'.py', '.js', '.jsx', '.ts', '.tsx', '.go', '.java', '.cpp', '.c', '.h', '.hpp'})
+
+# Files larger than this are generated code or data and are not scanned
+_MAX_SOURCE_BYTES = 2_000_000
+# Go and Java only allow imports before the first declaration, so only the head is scanned
+_IMPORT_HEAD_BYTES = 64 * 1024
+
+
 class DependencyTracer:
     """Trace dependencies across multiple programming languages."""
     
     def __init__(self, repo_root: str):
         self.repo_root = Path(repo_root).resolve()
         self.file_map: Dict[str, Path] = {}
+        # Dotted Python module name -> file ('a.b' -> a/b/__init__.py or a/b.py)
+        self._py_modules: Dict[str, Path] = {}
+        # Entry names of every scanned directory, for existence checks without stat
+        self._dir_files: Dict[Path, Set[str]] = {}
+        # Parsed direct dependencies keyed by (path, mtime_ns)
+        self._dep_cache: Dict[Tuple[Path, int], Set[Path]] = {}
+        # One canonical Path per file, so set lookups reuse its cached str and hash
+        self._paths: Dict[str, Path] = {}
         self._build_file_map()
         
     def _build_file_map(self):
         """Build a map of module names to file paths."""
-        for root, dirs, files in os.walk(self.repo_root):
-            # Skip common ignored directories
-            dirs[:] = [d for d in dirs if d not in {'.git', '__pycache__', 'node_modules', 'venv', '.venv', 'dist', 'build'}]
+        for entry in self._walk(str(self.repo_root)):
+            name = entry.name
+            dot = name.rfind('.')
+            if dot < 0:
+                continue
+            ext = name[dot:]
+            if ext not in _EXTS:
+                continue
+            
+            file_path = self._intern(Path(entry.path))
+            rel_path = file_path.relative_to(self.repo_root)
+            self.file_map[str(rel_path)] = file_path
+            if ext == '.py':
+                self._add_python_module(rel_path, file_path)
+    
+    def _add_python_module(self, rel_path: Path, file_path: Path):
+        """Index a .py file under its dotted module name; packages win over same-named modules."""
+        parts = rel_path.with_suffix('').parts
+        if any('.' in part for part in parts):
+            return  # Not importable by dotted name
+        
+        is_package = parts[-1] == '__init__'
+        name = '.'.join(parts[:-1] if is_package else parts)
+        if is_package or name not in self._py_modules:
+            self._py_modules[name] = file_path
+    
+    def _walk(self, root: str):
+        """Yield the non-directory entries under root, reusing scandir's cached file types."""
+        # List entries before recursing so only one directory handle is open at a time
+        try:
+            with os.scandir(root) as it:
+                entries = list(it)
+        except OSError:
+            return
+        self._dir_files[Path(root)] = {entry.name for entry in entries}
+        
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
             
-            for file in files:
-                if file.endswith(('.py', '.js', '.jsx', '.ts', '.tsx', '.go', '.java', '.cpp', '.c', '.h', '.hpp')):
-                    file_path = Path(root) / file
-                    rel_path = file_path.relative_to(self.repo_root)
-                    self.file_map[str(rel_path)] = file_path
+            if not is_dir:
+                yield entry
+            # Skip common ignored directories, and never follow directory symlinks
+            elif entry.name not in _SKIP_DIRS and not entry.is_symlink():
+                yield from self._walk(entry.path)
+    
+    def _intern(self, path: Path) -> Path:
+        """Return the canonical instance of path."""
+        return self._paths.setdefault(str(path), path)
+    
+    def _norm(self, path: Path) -> Path:
+        """Make path absolute under the repo root and collapse '..' lexically, without stat calls."""
+        return Path(os.path.normpath(os.path.join(self.repo_root, path)))
+    
+    def _path_exists(self, path: Path) -> bool:
+        """Check a path against the scanned listings, probing only unscanned directories."""
+        names = self._dir_files.get(path.parent)
+        if names is None:
+            return path.exists()
+        return path.name in names
     
     def trace_dependencies(self, focus_file: str) -> Set[Path]:
         """
         Trace all dependencies for a given focus file.
         Returns a set of file paths that the focus file depends on.
         """
-        focus_path = (self.repo_root / focus_file).resolve()
+        focus_path = self._intern((self.repo_root / focus_file).resolve())
         if not focus_path.exists():
             raise FileNotFoundError(f"Focus file not found: {focus_file}")
         
-        dependencies: Set[Path] = set()
-        visited: Set[Path] = set()
-        to_process = [focus_path]
-        
-        while to_process:
-            current_file = to_process.pop()
-            
-            if current_file in visited:
-                continue
-            
-            visited.add(current_file)
-            
-            # Get direct dependencies
-            deps = self._get_direct_dependencies(current_file)
-            
-            for dep in deps:
-                if dep not in dependencies and dep != focus_path:
-                    dependencies.add(dep)
-                    if dep not in visited:
-                        to_process.append(dep)
-        
-        return dependencies
+        # Every file is marked when first reached, so it is enqueued exactly once
+        discovered: Set[Path] = {focus_path}
+        frontier = [focus_path]
+        
+        # Expand one BFS level at a time, reading the level's files concurrently
+        with ThreadPoolExecutor(max_workers=(os.cpu_count() or 1) * 2) as executor:
+            while frontier:
+                next_frontier = []
+                
+                for deps in executor.map(self._get_direct_dependencies, frontier):
+                    for dep in deps:
+                        if dep in discovered:
+                            continue
+                        discovered.add(dep)
+                        next_frontier.append(dep)
+                
+                frontier = next_frontier
+        
+        discovered.discard(focus_path)
+        return discovered
     
     def _get_direct_dependencies(self, file_path: Path) -> Set[Path]:
         """Extract direct dependencies from a file based on its language."""
         deps: Set[Path] = set()
         
+        # Reuse the parse of a file that has not changed since it was last read.
+        # deps is cached up front and filled below, so unreadable files are remembered too.
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-        except Exception:
+            stat = file_path.stat()
+        except OSError:
             return deps
+        key = (file_path, stat.st_mtime_ns)
+        if key in self._dep_cache:
+            return self._dep_cache[key]
+        self._dep_cache[key] = deps
         
-        ext = file_path.suffix
+        if stat.st_size > _MAX_SOURCE_BYTES:
+            return deps
         
-        if ext == '.py':
-            deps.update(self._parse_python_imports(content, file_path))
-        elif ext in {'.js', '.jsx', '.ts', '.tsx'}:
-            deps.update(self._parse_js_imports(content, file_path))
-        elif ext == '.go':
-            deps.update(self._parse_go_imports(content, file_path))
-        elif ext in {'.java'}:
-            deps.update(self._parse_java_imports(content, file_path))
-        elif ext in {'.c', '.cpp', '.h', '.hpp'}:
-            deps.update(self._parse_c_includes(content, file_path))
+        # Map the file instead of copying it; empty files cannot be mapped and have no imports
+        try:
+            with open(file_path, 'rb') as f:
+                content = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            return deps
         
+        ext = file_path.suffix
+        found: Set[Path] = set()
+        
+        with content:
+            if ext == '.py':
+                found = self._parse_python_imports(content, file_path)
+            elif ext in {'.js', '.jsx', '.ts', '.tsx'}:
+                found = self._parse_js_imports(content, file_path)
+            elif ext == '.go':
+                found = self._parse_go_imports(content[:_IMPORT_HEAD_BYTES], file_path)
+            elif ext in {'.java'}:
+                found = self._parse_java_imports(content[:_IMPORT_HEAD_BYTES], file_path)
+            elif ext in {'.c', '.cpp', '.h', '.hpp'}:
+                found = self._parse_c_includes(content, file_path)
+        
+        deps.update(map(self._intern, found))
         return deps
     
-    def _parse_python_imports(self, content: str, file_path: Path) -> Set[Path]:
+    def _parse_python_imports(self, content: bytes, file_path: Path) -> Set[Path]:
         """Parse Python import statements."""
         deps: Set[Path] = set()
         
-        # Match: import module, from module import x, from . import x, from ..module import x
-        patterns = [
-            r'^\s*import\s+([a-zA-Z_][\w.]*)',
-            r'^\s*from\s+([a-zA-Z_][\w.]*)\s+import',
-            r'^\s*from\s+(\.+[\w.]*)\s+import',
-        ]
-        
-        for pattern in patterns:
-            for match in re.finditer(pattern, content, re.MULTILINE):
-                module = match.group(1)
-                resolved = self._resolve_python_module(module, file_path)
-                if resolved:
-                    deps.add(resolved)
+        for module in self._python_import_names(content, file_path):
+            resolved = self._resolve_python_module(module, file_path)
+            if resolved:
+                deps.add(resolved)
         
         return deps
     
+    def _python_import_names(self, content: bytes, file_path: Path) -> List[str]:
+        """List imported module names, using the regex scan for unparseable files."""
+        try:
+            tree = ast.parse(content[:], filename=str(file_path))
+        except (SyntaxError, ValueError, RecursionError):
+            return [
+                (match.group('abs') or match.group('from')).decode('utf-8', 'ignore')
+                for match in _PY_IMPORT_RE.finditer(content)
+            ]
+        
+        modules = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom):
+                modules.append('.' * node.level + (node.module or ''))
+        
+        return modules
+    
     def _resolve_python_module(self, module: str, current_file: Path) -> Path | None:
         """Resolve a Python module to a file path."""
-        # Handle relative imports
-        if module.startswith('.'):
-            parts = module.split('.')
-            level = len([p for p in parts if p == ''])
-            module_parts = [p for p in parts if p]
-            
-            parent = current_file.parent
-            for _ in range(level - 1):
-                parent = parent.parent
-            
-            if module_parts:
-                target = parent / '/'.join(module_parts)
-            else:
-                target = parent
-            
-            # Check for __init__.py or .py file
-            if (target / '__init__.py').exists():
-                return target / '__init__.py'
-            if (target.parent / f'{target.name}.py').exists():
-                return target.parent / f'{target.name}.py'
+        # Package (__init__.py) or module (.py) from the index built with the file map.
+        # Absolute names are already index keys.
+        if not module.startswith('.'):
+            return self._py_modules.get(module)
         
-        # Handle absolute imports
-        module_path = module.replace('.', '/')
+        # Handle relative imports by rebasing them onto the repo root
+        relative = module.lstrip('.')
+        level = len(module) - len(relative)
         
-        # Try as package
-        package_init = self.repo_root / module_path / '__init__.py'
-        if package_init.exists():
-            return package_init
+        parent = current_file.parent
+        for _ in range(level - 1):
+            parent = parent.parent
         
-        # Try as module
-        module_file = self.repo_root / f'{module_path}.py'
-        if module_file.exists():
-            return module_file
+        try:
+            module_parts = [*parent.relative_to(self.repo_root).parts, *relative.split('.')]
+        except ValueError:
+            return None
         
-        return None
+        return self._py_modules.get('.'.join(p for p in module_parts if p))
     
-    def _parse_js_imports(self, content: str, file_path: Path) -> Set[Path]:
+    def _parse_js_imports(self, content: bytes, file_path: Path) -> Set[Path]:
         """Parse JavaScript/TypeScript import statements."""
         deps: Set[Path] = set()
         
-        # Match: import x from 'path', require('path'), import('path')
-        patterns = [
-            r'import\s+.*?\s+from\s+["\']([^"\']+)["\']',
-            r'require\s*\(["\']([^"\']+)["\']\)',
-            r'import\s*\(["\']([^"\']+)["\']\)',
-        ]
-        
-        for pattern in patterns:
-            for match in re.finditer(pattern, content):
-                import_path = match.group(1)
+        for pattern in (_JS_IMPORT_RE, _JS_CALL_RE):
+            for match in pattern.finditer(content):
+                import_path = match.group(match.lastindex).decode('utf-8', 'ignore')
                 resolved = self._resolve_js_import(import_path, file_path)
                 if resolved:
                     deps.add(resolved)
@@ -172,30 +287,29 @@ class DependencyTracer:
         if import_path.startswith('.'):
             # Relative import
             base = current_file.parent
-            target_path = (base / import_path).resolve()
+            target_path = self._norm(base / import_path)
             
             # Try different extensions
             for ext in ['', '.js', '.jsx', '.ts', '.tsx', '/index.js', '/index.jsx', '/index.ts', '/index.tsx']:
                 check_path = Path(str(target_path) + ext)
-                if check_path.exists() and check_path.is_relative_to(self.repo_root):
+                if self._path_exists(check_path) and check_path.is_relative_to(self.repo_root):
                     return check_path
         
         return None
     
-    def _parse_go_imports(self, content: str, file_path: Path) -> Set[Path]:
+    def _parse_go_imports(self, content: bytes, file_path: Path) -> Set[Path]:
         """Parse Go import statements."""
         deps: Set[Path] = set()
         
-        # Match: import "path" and import ( "path1" "path2" )
-        patterns = [
-            r'import\s+"([^"]+)"',
-            r'import\s+\([^)]*"([^"]+)"[^)]*\)',
-        ]
-        
-        for pattern in patterns:
-            for match in re.finditer(pattern, content, re.DOTALL):
+        for match in _GO_IMPORT_RE.finditer(content):
+            if match.lastindex == 1:
+                import_paths = [match.group(1)]
+            else:
+                import_paths = _GO_STR_RE.findall(match.group(2))
+            
+            for import_path in import_paths:
                 # Only handle local imports (relative paths)
-                import_path = match.group(1)
+                import_path = import_path.decode('utf-8', 'ignore')
                 if import_path.startswith('.'):
                     resolved = self._resolve_go_import(import_path, file_path)
                     if resolved:
@@ -207,7 +321,7 @@ class DependencyTracer:
         """Resolve a Go import to a file path."""
         if import_path.startswith('.'):
             base = current_file.parent
-            target_dir = (base / import_path).resolve()
+            target_dir = self._norm(base / import_path)
             
             if target_dir.is_dir() and target_dir.is_relative_to(self.repo_root):
                 # Return the directory as Go packages are directories
@@ -215,15 +329,12 @@ class DependencyTracer:
         
         return None
     
-    def _parse_java_imports(self, content: str, file_path: Path) -> Set[Path]:
+    def _parse_java_imports(self, content: bytes, file_path: Path) -> Set[Path]:
         """Parse Java import statements."""
         deps: Set[Path] = set()
         
-        # Match: import package.Class;
-        pattern = r'import\s+([\w.]+);'
-        
-        for match in re.finditer(pattern, content):
-            import_path = match.group(1)
+        for match in _JAVA_IMPORT_RE.finditer(content):
+            import_path = match.group(1).decode('utf-8', 'ignore')
             resolved = self._resolve_java_import(import_path)
             if resolved:
                 deps.add(resolved)
@@ -241,29 +352,22 @@ class DependencyTracer:
         
         return None
     
-    def _parse_c_includes(self, content: str, file_path: Path) -> Set[Path]:
+    def _parse_c_includes(self, content: bytes, file_path: Path) -> Set[Path]:
         """Parse C/C++ include statements."""
         deps: Set[Path] = set()
         
-        # Match: #include "file.h" and #include <file.h>
-        patterns = [
-            r'#include\s+"([^"]+)"',
-            r'#include\s+<([^>]+)>',
-        ]
-        
-        for pattern in patterns:
-            for match in re.finditer(pattern, content):
-                include_path = match.group(1)
-                resolved = self._resolve_c_include(include_path, file_path)
-                if resolved:
-                    deps.add(resolved)
+        for match in _C_INCLUDE_RE.finditer(content):
+            include_path = match.group(match.lastindex).decode('utf-8', 'ignore')
+            resolved = self._resolve_c_include(include_path, file_path)
+            if resolved:
+                deps.add(resolved)
         
         return deps
     
     def _resolve_c_include(self, include_path: str, current_file: Path) -> Path | None:
         """Resolve a C/C++ include to a file path."""
         # Try relative to current file
-        rel_path = (current_file.parent / include_path).resolve()
+        rel_path = self._norm(current_file.parent / include_path)
         if rel_path.exists() and rel_path.is_relative_to(self.repo_root):
             return rel_path
         
@@ -284,6 +388,13 @@ def main():
     repo_root = sys.argv[1]
     focus_file = sys.argv[2]
     
+    # ast.parse warns about dubious code in the scanned files (e.g. "\d" escapes),
+    # which is not ours to report. Filtered up front, since catch_warnings is not
+    # thread-safe and files are parsed in a thread pool. Python < 3.12 issues the
+    # escape warning as a DeprecationWarning.
+    warnings.filterwarnings('ignore', category=SyntaxWarning)
+    warnings.filterwarnings('ignore', message='invalid escape sequence', category=DeprecationWarning)
+    
     tracer = DependencyTracer(repo_root)
     
     try: